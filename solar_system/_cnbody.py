@@ -0,0 +1,77 @@
+"""
+_cnbody.py
+
+ctypes bindings for the optional C acceleration kernel in `_nbody_c.c`.
+
+The shared library is looked up next to this module. If it has not been built,
+`HAVE_CEXT` is False and callers fall back to the NumPy implementation.
+"""
+
+import ctypes
+import os
+
+import numpy as np
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_LIBNAMES = ("_nbody_c.so", "_nbody_c.dylib", "_nbody_c.dll")
+
+_lib = None
+for _name in _LIBNAMES:
+    _path = os.path.join(_HERE, _name)
+    if os.path.exists(_path):
+        try:
+            _lib = ctypes.CDLL(_path)
+        except OSError:
+            continue
+        break
+
+HAVE_CEXT = _lib is not None
+
+if HAVE_CEXT:
+    _lib.accel2d.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int,
+                             ctypes.c_double, ctypes.c_double, ctypes.c_void_p]
+    _lib.accel2d.restype = None
+
+
+def supports(positions, masses, out):
+    """
+    Return True if the C kernel is built and can work on these arrays in place.
+
+    The kernel reads and writes the caller's buffers directly, so all of them
+    must be C-contiguous float64 arrays.
+    """
+    return (HAVE_CEXT
+            and all(a.dtype == np.float64 and a.flags.c_contiguous
+                    for a in (positions, masses, out)))
+
+
+def accel2d(positions, masses, G, eps2, out):
+    """
+    Compute softened gravitational accelerations with the C kernel.
+
+    Parameters
+    ----------
+    positions : ndarray, shape (N, 2)
+        Positions [m], C-contiguous float64.
+    masses : ndarray, shape (N,)
+        Masses [kg], C-contiguous float64.
+    G : float
+        Gravitational constant [m³ kg⁻¹ s⁻²].
+    eps2 : float
+        Squared softening length [m²]. Must be strictly positive.
+    out : ndarray, shape (N, 2)
+        Output buffer for the accelerations [m/s²], C-contiguous float64.
+
+    Returns
+    -------
+    out : ndarray, shape (N, 2)
+        The `out` buffer, filled with the net acceleration of each body.
+
+    Notes
+    -----
+    No arrays are allocated or copied; use :func:`supports` to check that the
+    inputs qualify.
+    """
+    _lib.accel2d(positions.ctypes.data, masses.ctypes.data, len(positions),
+                 G, eps2, out.ctypes.data)
+    return out
@@ -0,0 +1,367 @@
+"""
+_kernels.py
+
+Numba-compiled kernels for the 2D N-body Solar System simulation.
+
+These routines mirror `dynamics.compute_accelerations` and the integrators in
+`integration`, but are written as explicit loops over bodies and write their
+results into caller-supplied buffers, so that no temporary arrays are created
+inside the time loop. `run_loop` runs the whole time loop in compiled code, so
+Python is entered once per simulation rather than once per step. Compiled code
+is cached on disk (``cache=True``) to avoid paying the compilation cost on
+every run.
+
+Numba is an optional dependency: if it is not installed, `HAVE_NUMBA` is False,
+the functions below remain plain (slow) Python, and the simulation falls back
+to the pure-NumPy routines.
+"""
+
+import sys
+
+import numpy as np
+from . import barneshut
+from .dynamics import epsilon
+from .integration import DOPRI5_A
+
+# This module, used by `run_loop` to pass kernels to `_integrate`
+_self = sys.modules[__name__]
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """No-op replacement for `numba.njit` when Numba is unavailable."""
+        def decorator(func):
+            return func
+        return decorator
+
+
+# Squared softening length [m²]
+EPS2 = epsilon * epsilon
+
+# Tile size (in bodies) of the pairwise loop in `_accel`
+BLOCK = 64
+
+# Integer identifiers of the integration methods understood by `run_loop`
+EULER = 0
+RK4 = 1
+VERLET = 2
+DOPRI5 = 3
+METHOD_IDS = {"euler": EULER, "rk4": RK4, "verlet": VERLET, "dopri5": DOPRI5}
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _accel(pos, masses, G, out):
+    """
+    Compute the net gravitational acceleration on each body into `out`.
+
+    Parameters
+    ----------
+    pos : ndarray, shape (N, 2)
+        Positions [m].
+    masses : ndarray, shape (N,)
+        Masses [kg].
+    G : float
+        Gravitational constant [m³ kg⁻¹ s⁻²].
+    out : ndarray, shape (N, 2)
+        Output buffer for the accelerations [m/s²].
+
+    Notes
+    -----
+    `pos` and `masses` may be stored in float32; each pair is evaluated in
+    float64 and accumulated into `out`, which the time loop allocates as
+    float64 regardless of the storage dtype.
+    """
+    n = pos.shape[0]
+    out[:, :] = 0.0
+
+    # Newton's third law: visit each pair i < j once and apply equal and
+    # opposite contributions to both bodies. Pairs are visited in tiles of
+    # BLOCK x BLOCK bodies so that both tiles stay in L1 cache for large N;
+    # for N <= BLOCK this is a single tile.
+    for ib in range(0, n, BLOCK):
+        ie = min(ib + BLOCK, n)
+        for jb in range(ib, n, BLOCK):
+            je = min(jb + BLOCK, n)
+            for i in range(ib, ie):
+                xi = float(pos[i, 0])
+                yi = float(pos[i, 1])
+                mi = float(masses[i])
+                ax = 0.0
+                ay = 0.0
+                for j in range(max(jb, i + 1), je):
+                    dx = float(pos[j, 0]) - xi
+                    dy = float(pos[j, 1]) - yi
+                    r2 = dx * dx + dy * dy + EPS2
+                    inv_r3 = r2**-1.5
+                    fx = G * dx * inv_r3
+                    fy = G * dy * inv_r3
+                    mj = float(masses[j])
+                    ax += fx * mj
+                    ay += fy * mj
+                    out[j, 0] -= fx * mi
+                    out[j, 1] -= fy * mi
+                out[i, 0] += ax
+                out[i, 1] += ay
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _accel_n2(pos, masses, G, out):
+    """Two-body specialization of `_accel`: a single pair, no loops."""
+    dx = float(pos[1, 0]) - float(pos[0, 0])
+    dy = float(pos[1, 1]) - float(pos[0, 1])
+    r2 = dx * dx + dy * dy + EPS2
+    inv_r3 = r2**-1.5
+    ax = G * dx * inv_r3
+    ay = G * dy * inv_r3
+    out[0, 0] = ax * float(masses[1])
+    out[0, 1] = ay * float(masses[1])
+    out[1, 0] = -ax * float(masses[0])
+    out[1, 1] = -ay * float(masses[0])
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _euler_step(accel, kargs, pos, vel, masses, dt, G, acc):
+    """
+    Advance `pos` and `vel` in place by one explicit Euler step.
+
+    `accel` is the acceleration kernel selected by `run_loop`, called as
+    ``accel(pos, masses, G, out, *kargs)``, and `acc` a scratch buffer of
+    shape (N, 2).
+    """
+    n = pos.shape[0]
+    accel(pos, masses, G, acc, *kargs)
+    for i in range(n):
+        for d in range(2):
+            vel[i, d] += acc[i, d] * dt
+            pos[i, d] += vel[i, d] * dt
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _rk4_step(accel, kargs, pos, vel, masses, dt, G,
+              k1x, k1v, k2x, k2v, k3x, k3v, k4x, k4v, tmp_pos, tmp_acc):
+    """
+    Advance `pos` and `vel` in place by one classical RK4 step.
+
+    `accel` and `kargs` are as in `_euler_step`. All remaining arguments are
+    scratch buffers of shape (N, 2), allocated once by the caller and reused
+    across steps.
+    """
+    n = pos.shape[0]
+
+    # k1
+    accel(pos, masses, G, tmp_acc, *kargs)
+    for i in range(n):
+        for d in range(2):
+            k1v[i, d] = tmp_acc[i, d] * dt
+            k1x[i, d] = vel[i, d] * dt
+            tmp_pos[i, d] = pos[i, d] + 0.5 * k1x[i, d]
+
+    # k2
+    accel(tmp_pos, masses, G, tmp_acc, *kargs)
+    for i in range(n):
+        for d in range(2):
+            k2v[i, d] = tmp_acc[i, d] * dt
+            k2x[i, d] = (vel[i, d] + 0.5 * k1v[i, d]) * dt
+            tmp_pos[i, d] = pos[i, d] + 0.5 * k2x[i, d]
+
+    # k3
+    accel(tmp_pos, masses, G, tmp_acc, *kargs)
+    for i in range(n):
+        for d in range(2):
+            k3v[i, d] = tmp_acc[i, d] * dt
+            k3x[i, d] = (vel[i, d] + 0.5 * k2v[i, d]) * dt
+            tmp_pos[i, d] = pos[i, d] + k3x[i, d]
+
+    # k4
+    accel(tmp_pos, masses, G, tmp_acc, *kargs)
+    for i in range(n):
+        for d in range(2):
+            k4v[i, d] = tmp_acc[i, d] * dt
+            k4x[i, d] = (vel[i, d] + k3v[i, d]) * dt
+
+    for i in range(n):
+        for d in range(2):
+            pos[i, d] += (k1x[i, d] + 2 * k2x[i, d] + 2 * k3x[i, d] + k4x[i, d]) / 6
+            vel[i, d] += (k1v[i, d] + 2 * k2v[i, d] + 2 * k3v[i, d] + k4v[i, d]) / 6
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _verlet_step(accel, kargs, pos, vel, masses, dt, G, acc):
+    """
+    Advance `pos` and `vel` in place by one velocity Verlet step, using the
+    acceleration kernel `accel` with extra arguments `kargs`.
+
+    On entry `acc` holds the accelerations at `pos`; on exit it holds the
+    accelerations at the updated positions, ready for the next step.
+    """
+    n = pos.shape[0]
+    for i in range(n):
+        for d in range(2):
+            vel[i, d] += 0.5 * dt * acc[i, d]
+            pos[i, d] += dt * vel[i, d]
+    accel(pos, masses, G, acc, *kargs)
+    for i in range(n):
+        for d in range(2):
+            vel[i, d] += 0.5 * dt * acc[i, d]
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _dopri5_step(accel, kargs, pos, vel, masses, dt, G, kx, kv, tmp_pos, acc):
+    """
+    Advance `pos` and `vel` in place by one Dormand–Prince step, using the
+    acceleration kernel `accel` with extra arguments `kargs`.
+
+    `kx` and `kv` are stage buffers of shape (7, N, 2) and `tmp_pos` a scratch
+    buffer of shape (N, 2). As in `_verlet_step`, `acc` holds the
+    accelerations at `pos` on entry and at the updated positions on exit.
+    """
+    n = pos.shape[0]
+    for i in range(n):
+        for d in range(2):
+            kx[0, i, d] = vel[i, d]
+            kv[0, i, d] = acc[i, d]
+
+    for s in range(1, 7):
+        for i in range(n):
+            for d in range(2):
+                x = float(pos[i, d])
+                v = float(vel[i, d])
+                for j in range(s):
+                    a = dt * DOPRI5_A[s, j]
+                    x += a * kx[j, i, d]
+                    v += a * kv[j, i, d]
+                tmp_pos[i, d] = x
+                kx[s, i, d] = v
+        accel(tmp_pos, masses, G, acc, *kargs)
+        for i in range(n):
+            for d in range(2):
+                kv[s, i, d] = acc[i, d]
+
+    for i in range(n):
+        for d in range(2):
+            pos[i, d] = tmp_pos[i, d]
+            vel[i, d] = kx[6, i, d]
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _integrate(accel, kargs, pos, vel, masses, dt, G, method_id, traj):
+    """
+    Time loop of `run_loop` and `run_loop_bh`, specialized on the
+    acceleration kernel `accel`. The kernel is called as
+    ``accel(pos, masses, G, out, *kargs)``: `kargs` is empty for the direct
+    kernels and ``(theta,)`` for the Barnes–Hut one.
+
+    `pos` and `vel` are advanced in place, and the positions after each step
+    are written to `traj`, whose first axis sets the number of steps.
+    """
+    n = pos.shape[0]
+    steps = traj.shape[0] - 1
+
+    # Each method allocates only its own scratch buffers. Accelerations are
+    # always accumulated in float64.
+    acc = np.empty((n, 2), dtype=np.float64)
+    traj[0] = pos
+
+    if method_id == VERLET:
+        accel(pos, masses, G, acc, *kargs)
+        for step in range(1, steps + 1):
+            _verlet_step(accel, kargs, pos, vel, masses, dt, G, acc)
+            traj[step] = pos
+
+    elif method_id == EULER:
+        for step in range(1, steps + 1):
+            _euler_step(accel, kargs, pos, vel, masses, dt, G, acc)
+            traj[step] = pos
+
+    elif method_id == DOPRI5:
+        kx = np.empty((7, n, 2), dtype=np.float64)
+        kv = np.empty((7, n, 2), dtype=np.float64)
+        tmp_pos = np.empty_like(pos)
+        accel(pos, masses, G, acc, *kargs)
+        for step in range(1, steps + 1):
+            _dopri5_step(accel, kargs, pos, vel, masses, dt, G, kx, kv, tmp_pos, acc)
+            traj[step] = pos
+
+    else:
+        k1x = np.empty_like(pos)
+        k1v = np.empty_like(pos)
+        k2x = np.empty_like(pos)
+        k2v = np.empty_like(pos)
+        k3x = np.empty_like(pos)
+        k3v = np.empty_like(pos)
+        k4x = np.empty_like(pos)
+        k4v = np.empty_like(pos)
+        tmp_pos = np.empty_like(pos)
+        for step in range(1, steps + 1):
+            _rk4_step(accel, kargs, pos, vel, masses, dt, G,
+                      k1x, k1v, k2x, k2v, k3x, k3v, k4x, k4v, tmp_pos, acc)
+            traj[step] = pos
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def run_loop(pos0, vel0, masses, dt, G, steps, method_id):
+    """
+    Run the full time loop in compiled code.
+
+    Parameters
+    ----------
+    pos0 : ndarray, shape (N, 2)
+        Initial positions [m].
+    vel0 : ndarray, shape (N, 2)
+        Initial velocities [m/s].
+    masses : ndarray, shape (N,)
+        Masses [kg].
+    dt : float
+        Time step [s].
+    G : float
+        Gravitational constant [m³ kg⁻¹ s⁻²].
+    steps : int
+        Number of integration steps.
+    method_id : int
+        Integration method, one of `METHOD_IDS`.
+
+    Returns
+    -------
+    traj : ndarray, shape (steps + 1, N, 2)
+        Positions of all bodies at every step, including the initial state [m].
+    """
+    n = pos0.shape[0]
+    pos = pos0.copy()
+    vel = vel0.copy()
+    traj = np.empty((steps + 1, n, 2), dtype=pos0.dtype)
+
+    # Pick the acceleration kernel once, before the time loop; `_integrate`
+    # is compiled separately for each kernel. The kernels are looked up as
+    # attributes of this module rather than as plain globals: Numba embeds a
+    # dispatcher passed as a plain global by address, which would keep
+    # `run_loop` from being cached on disk.
+    if n == 2:
+        _integrate(_self._accel_n2, (), pos, vel, masses, dt, G, method_id, traj)
+    else:
+        _integrate(_self._accel, (), pos, vel, masses, dt, G, method_id, traj)
+
+    return traj
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def run_loop_bh(pos0, vel0, masses, dt, G, steps, method_id, theta):
+    """
+    Same as `run_loop`, with Barnes–Hut accelerations of opening angle
+    `theta` > 0 (see `barneshut`) instead of direct summation.
+    """
+    if not theta > 0.0:
+        raise ValueError("theta must be positive")
+
+    n = pos0.shape[0]
+    pos = pos0.copy()
+    vel = vel0.copy()
+    traj = np.empty((steps + 1, n, 2), dtype=pos0.dtype)
+
+    # The opening angle reaches the tree kernel as an extra kernel argument
+    _integrate(barneshut._accel_bh, (theta,), pos, vel, masses, dt, G, method_id, traj)
+
+    return traj
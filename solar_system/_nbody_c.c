@@ -0,0 +1,50 @@
+/*
+ * _nbody_c.c
+ *
+ * Optional C backend for the 2D N-body Solar System simulation: direct
+ * summation of softened gravitational accelerations.
+ *
+ * Positions and accelerations use the interleaved (n, 2) C-order layout of
+ * the NumPy arrays, so the caller's buffers are read and written directly
+ * without any conversion. The inner loop over j is branch-free.
+ * Self-interaction needs no special case: with eps2 > 0 the j == i term has
+ * dx = dy = 0 and contributes exactly zero.
+ *
+ * Build from the repository root with:
+ *
+ *     cc -O3 -mavx2 -mfma -ffast-math -shared -fPIC \
+ *        -o solar_system/_nbody_c.so solar_system/_nbody_c.c
+ *
+ * The library is loaded with ctypes by `solar_system/_cnbody.py`.
+ */
+
+#include <math.h>
+
+#ifdef _WIN32
+#define EXPORT __declspec(dllexport)
+#else
+#define EXPORT
+#endif
+
+EXPORT void accel2d(const double *restrict pos, const double *restrict m,
+                    int n, double G, double eps2, double *restrict acc)
+{
+    for (int i = 0; i < n; i++) {
+        const double xi = pos[2 * i];
+        const double yi = pos[2 * i + 1];
+        double sx = 0.0;
+        double sy = 0.0;
+
+        for (int j = 0; j < n; j++) {
+            const double dx = pos[2 * j] - xi;
+            const double dy = pos[2 * j + 1] - yi;
+            const double inv_r = 1.0 / sqrt(dx * dx + dy * dy + eps2);
+            const double s = m[j] * inv_r * inv_r * inv_r;
+            sx += s * dx;
+            sy += s * dy;
+        }
+
+        acc[2 * i] = G * sx;
+        acc[2 * i + 1] = G * sy;
+    }
+}
@@ -0,0 +1,280 @@
+"""
+barneshut.py
+
+Barnes–Hut approximation of the gravitational accelerations for large 2D
+N-body systems.
+
+The bodies are sorted into a quadtree: each cell is recursively split into four
+quadrants until it holds a single body, and stores the total mass and center of
+mass of its contents. The acceleration on a body is then accumulated by walking
+the tree from the root, replacing a whole cell of width `w` by its center of
+mass when it is seen under a small enough angle, ``w / d < theta``, and opening
+it otherwise. This costs O(N log N) per evaluation instead of O(N²).
+
+The tree is stored in flat arrays rather than Python objects, so that the
+routines can be compiled with Numba when it is available.
+"""
+
+import numpy as np
+from .dynamics import G, epsilon
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """No-op replacement for `numba.njit` when Numba is unavailable."""
+        def decorator(func):
+            return func
+        return decorator
+
+
+# Squared softening length [m²]
+EPS2 = epsilon * epsilon
+
+# Maximum tree depth; deeper cells are kept as leaves holding several bodies
+MAX_DEPTH = 48
+
+# Columns of the integer node table: range of the node's bodies in the sorted
+# body order, index of its first child, number of children and depth.
+START, END, CHILD, NCHILD, DEPTH = 0, 1, 2, 3, 4
+
+# Columns of the float node table: cell center and half-width, total mass and
+# center of mass.
+CX, CY, HALF, MASS, COMX, COMY = 0, 1, 2, 3, 4, 5
+
+
+@njit(cache=True, boundscheck=False)
+def _grow(table):
+    """Return a copy of `table` with twice as many rows."""
+    new = np.empty((2 * table.shape[0], table.shape[1]), dtype=table.dtype)
+    new[:table.shape[0]] = table
+    return new
+
+
+@njit(cache=True, boundscheck=False)
+def build_tree(pos, masses):
+    """
+    Build the Barnes–Hut quadtree of a set of bodies.
+
+    Parameters
+    ----------
+    pos : ndarray, shape (N, 2)
+        Positions [m].
+    masses : ndarray, shape (N,)
+        Masses [kg].
+
+    Returns
+    -------
+    order : ndarray of int, shape (N,)
+        Body indices sorted so that the bodies of every node are contiguous.
+    inode : ndarray of int, shape (M, 5)
+        Integer node table, columns `START`, `END`, `CHILD`, `NCHILD`, `DEPTH`.
+    fnode : ndarray of float, shape (M, 6)
+        Float node table, columns `CX`, `CY`, `HALF`, `MASS`, `COMX`, `COMY`.
+
+    Notes
+    -----
+    Node 0 is the root, a square enclosing all bodies. Nodes are created in
+    breadth-first order and the non-empty children of a node are stored
+    contiguously. Leaves have no children and hold one body, or several if
+    `MAX_DEPTH` is reached.
+    """
+    n = pos.shape[0]
+    order = np.arange(n)
+    buf = np.empty(n, dtype=np.int64)
+
+    cap = 2 * n + 1
+    inode = np.empty((cap, 5), dtype=np.int64)
+    fnode = np.empty((cap, 6), dtype=np.float64)
+
+    xmin = xmax = float(pos[0, 0]) if n > 0 else 0.0
+    ymin = ymax = float(pos[0, 1]) if n > 0 else 0.0
+    for b in range(n):
+        xmin = min(xmin, float(pos[b, 0]))
+        xmax = max(xmax, float(pos[b, 0]))
+        ymin = min(ymin, float(pos[b, 1]))
+        ymax = max(ymax, float(pos[b, 1]))
+    half = 0.5 * max(xmax - xmin, ymax - ymin)
+    half = half * (1.0 + 1e-12) + 1e-300
+
+    inode[0, START] = 0
+    inode[0, END] = n
+    inode[0, CHILD] = -1
+    inode[0, NCHILD] = 0
+    inode[0, DEPTH] = 0
+    fnode[0, CX] = 0.5 * (xmin + xmax)
+    fnode[0, CY] = 0.5 * (ymin + ymax)
+    fnode[0, HALF] = half
+    nnodes = 1
+
+    counts = np.empty(4, dtype=np.int64)
+    offsets = np.empty(4, dtype=np.int64)
+
+    k = 0
+    while k < nnodes:
+        s = inode[k, START]
+        e = inode[k, END]
+        cx = fnode[k, CX]
+        cy = fnode[k, CY]
+        half = fnode[k, HALF]
+
+        # Total mass and center of mass of the node
+        m = 0.0
+        mx = 0.0
+        my = 0.0
+        for t in range(s, e):
+            b = order[t]
+            mb = float(masses[b])
+            m += mb
+            mx += mb * float(pos[b, 0])
+            my += mb * float(pos[b, 1])
+        fnode[k, MASS] = m
+        fnode[k, COMX] = mx / m if m > 0.0 else cx
+        fnode[k, COMY] = my / m if m > 0.0 else cy
+
+        if e - s > 1 and inode[k, DEPTH] < MAX_DEPTH:
+            # Sort the node's bodies by quadrant: q = (x >= cx) + 2 * (y >= cy)
+            counts[:] = 0
+            for t in range(s, e):
+                b = order[t]
+                q = int(pos[b, 0] >= cx) + 2 * int(pos[b, 1] >= cy)
+                counts[q] += 1
+            off = s
+            for q in range(4):
+                offsets[q] = off
+                off += counts[q]
+            for t in range(s, e):
+                b = order[t]
+                q = int(pos[b, 0] >= cx) + 2 * int(pos[b, 1] >= cy)
+                buf[offsets[q]] = b
+                offsets[q] += 1
+            order[s:e] = buf[s:e]
+
+            while nnodes + 4 > inode.shape[0]:
+                inode = _grow(inode)
+                fnode = _grow(fnode)
+
+            inode[k, CHILD] = nnodes
+            nchild = 0
+            off = s
+            for q in range(4):
+                if counts[q] == 0:
+                    continue
+                c = nnodes
+                inode[c, START] = off
+                inode[c, END] = off + counts[q]
+                inode[c, CHILD] = -1
+                inode[c, NCHILD] = 0
+                inode[c, DEPTH] = inode[k, DEPTH] + 1
+                fnode[c, CX] = cx + (0.5 * half if q & 1 else -0.5 * half)
+                fnode[c, CY] = cy + (0.5 * half if q & 2 else -0.5 * half)
+                fnode[c, HALF] = 0.5 * half
+                off += counts[q]
+                nnodes += 1
+                nchild += 1
+            inode[k, NCHILD] = nchild
+
+        k += 1
+
+    return order, inode[:nnodes], fnode[:nnodes]
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _accel_bh(pos, masses, G, out, theta):
+    """
+    Compute Barnes–Hut accelerations into `out`.
+
+    Same arguments as the direct kernels in `_kernels`, plus the opening
+    angle `theta`. A cell is opened if the body lies inside it or if
+    ``w / d >= theta``, with `w` the cell width and `d` the distance to its
+    center of mass; leaves are always summed exactly. With ``theta = 0``
+    every cell is opened and the result equals direct summation.
+    """
+    n = pos.shape[0]
+    order, inode, fnode = build_tree(pos, masses)
+    theta2 = theta * theta
+    stack = np.empty(4 * (MAX_DEPTH + 2), dtype=np.int64)
+
+    for i in range(n):
+        xi = float(pos[i, 0])
+        yi = float(pos[i, 1])
+        ax = 0.0
+        ay = 0.0
+
+        stack[0] = 0
+        sp = 1
+        while sp > 0:
+            sp -= 1
+            k = stack[sp]
+
+            if inode[k, NCHILD] == 0:
+                # Leaf: exact sum over its bodies
+                for t in range(inode[k, START], inode[k, END]):
+                    b = order[t]
+                    if b != i:
+                        dx = float(pos[b, 0]) - xi
+                        dy = float(pos[b, 1]) - yi
+                        r2 = dx * dx + dy * dy + EPS2
+                        s = float(masses[b]) * r2**-1.5
+                        ax += s * dx
+                        ay += s * dy
+                continue
+
+            dx = fnode[k, COMX] - xi
+            dy = fnode[k, COMY] - yi
+            d2 = dx * dx + dy * dy
+            half = fnode[k, HALF]
+            width = 2.0 * half
+            inside = abs(xi - fnode[k, CX]) <= half and abs(yi - fnode[k, CY]) <= half
+
+            if not inside and width * width < theta2 * d2:
+                # Far enough: use the cell's center of mass
+                r2 = d2 + EPS2
+                s = fnode[k, MASS] * r2**-1.5
+                ax += s * dx
+                ay += s * dy
+            else:
+                c0 = inode[k, CHILD]
+                for c in range(c0, c0 + inode[k, NCHILD]):
+                    stack[sp] = c
+                    sp += 1
+
+        out[i, 0] = G * ax
+        out[i, 1] = G * ay
+
+
+def compute_accelerations_bh(positions, masses, G=G, theta=0.5):
+    """
+    Compute the net gravitational accelerations with the Barnes–Hut algorithm.
+
+    Parameters
+    ----------
+    positions : numpy.ndarray of shape (N, 2)
+        Array of 2D position vectors for all bodies [m].
+    masses : numpy.ndarray of shape (N,)
+        Masses of all bodies [kg].
+    G : float, optional
+        Gravitational constant [m³ kg⁻¹ s⁻²].
+        Defaults to the module-level value `G`.
+    theta : float, default=0.5
+        Opening angle. Smaller values are more accurate and more expensive;
+        ``theta = 0`` reproduces direct summation.
+
+    Returns
+    -------
+    acc : numpy.ndarray of shape (N, 2)
+        Approximate net acceleration vectors of each body [m/s²].
+
+    Notes
+    -----
+    Worth it over :func:`dynamics.compute_accelerations` from a few hundred
+    bodies on; for the Solar System itself direct summation is faster.
+    """
+    if theta < 0:
+        raise ValueError("theta must be non-negative")
+
+    positions = np.ascontiguousarray(positions)
+    masses = np.ascontiguousarray(masses)
+    acc = np.empty(positions.shape, dtype=np.float64)
+    _accel_bh(positions, masses, G, acc, theta)
+    return acc.astype(np.result_type(positions, masses, 1.0), copy=False)
@@ -4,36 +4,77 @@ cli.py
 Command-line interface for running 2D Solar System simulations.
 """
 
-import argparse
-from .run_simulation import run_simulation
+import sys
 
+# Default settings, shared by the argument parser and the no-argument fast path
+DEFAULTS = {
+    "nplanets": 4,
+    "steps": 10000,
+    "dt": 80000,
+    "method": "verlet",
+    "outfile": "orbits.png",
+    "timeseries": "timeseries.png",
+    "show": False,
+    "include_cog": False,
+    "force": "direct",
+    "theta": 0.5,
+}
 
-def main():
+
+def main(argv=None):
     """
     Parse command-line arguments and run the Solar System simulation.
+
+    Parameters
+    ----------
+    argv : list of str, optional
+        Command-line arguments, excluding the program name.
+        Defaults to ``sys.argv[1:]``.
+
+    Notes
+    -----
+    `argparse` and the simulation modules are imported lazily: when no
+    arguments are given, the parser is not built at all.
     """
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if not argv:
+        from .run_simulation import run_simulation
+        run_simulation(**DEFAULTS)
+        return
+
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Run a 2D Solar System N-body simulation with visualization."
     )
 
-    parser.add_argument("--nplanets", type=int, default=4,
+    parser.add_argument("--nplanets", type=int, default=DEFAULTS["nplanets"],
                         help="Number of planets (including the Sun).")
-    parser.add_argument("--steps", type=int, default=10000,
+    parser.add_argument("--steps", type=int, default=DEFAULTS["steps"],
                         help="Number of integration steps.")
-    parser.add_argument("--dt", type=float, default=80000,
+    parser.add_argument("--dt", type=float, default=DEFAULTS["dt"],
                         help="Time step [s].")
-    parser.add_argument("--method", type=str, choices=["rk4", "euler"], default="rk4",
-                        help="Integration method.")
-    parser.add_argument("--outfile", type=str, default="orbits.png",
+    parser.add_argument("--method", type=str, choices=["verlet", "rk4", "dopri5", "euler"],
+                        default=DEFAULTS["method"], help="Integration method.")
+    parser.add_argument("--force", type=str, choices=["direct", "bh"],
+                        default=DEFAULTS["force"],
+                        help="Force computation: direct summation or Barnes-Hut tree.")
+    parser.add_argument("--theta", type=float, default=DEFAULTS["theta"],
+                        help="Barnes-Hut opening angle, > 0 (with --force bh).")
+    parser.add_argument("--outfile", type=str, default=DEFAULTS["outfile"],
                         help="Output filename for orbit plot.")
-    parser.add_argument("--timeseries", type=str, default="timeseries.png",
+    parser.add_argument("--timeseries", type=str, default=DEFAULTS["timeseries"],
                         help="Output filename for time series plot.")
     parser.add_argument("--show", action="store_true",
                         help="Display plots interactively.")
     parser.add_argument("--cog", "--CoG", dest="include_cog", action="store_true",
                         help="Compute and plot center of gravity (CoG).")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    from .run_simulation import run_simulation
 
     run_simulation(
         nplanets=args.nplanets,
@@ -44,6 +85,8 @@ def main():
         timeseries=args.timeseries,
         show=args.show,
         include_cog=args.include_cog,
+        force=args.force,
+        theta=args.theta,
     )
 
 
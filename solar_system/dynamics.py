@@ -8,7 +8,10 @@ accelerations between celestial bodies under Newtonian gravity. A small softenin
 parameter `epsilon` is used to prevent singularities when two bodies get too close.
 """
 
+import math
+
 import numpy as np
+from . import _cnbody
 
 # Universal gravitational constant [m^3 kg^-1 s^-2]
 G = 6.67430e-11
@@ -16,8 +19,11 @@ G = 6.67430e-11
 # Softening length to avoid numerical singularities [m]
 epsilon = 1e-6
 
+# Number of body pairs evaluated at once by `compute_accelerations_into`
+PAIR_CHUNK = 2**16
+
 
-def gravitational_force(r1, r2, m1, m2):
+def gravitational_force(r1, r2, m1, m2, softening=epsilon):
     """
     Compute the gravitational force vector exerted on body 1 by body 2.
 
@@ -31,25 +37,27 @@ def gravitational_force(r1, r2, m1, m2):
         Mass of body 1 [kg].
     m2 : float
         Mass of body 2 [kg].
+    softening : float, optional
+        Softening length ε [m]. Defaults to the module-level value `epsilon`.
 
     Returns
     -------
     force_vec : numpy.ndarray of shape (2,)
         Gravitational force vector acting on body 1 due to body 2 [N].
 
-    Raises
-    ------
-    ValueError
-        If the distance between bodies is smaller than `epsilon`, to prevent
-        division by zero or numerical overflow.
-
     Notes
     -----
-    The gravitational force is computed using Newton’s law of gravitation:
+    The gravitational force is computed using Newton’s law of gravitation,
+    with Plummer softening of length ε:
 
-        F₁₂ = G * m₁ * m₂ / |r₂ - r₁|² * (r₂ - r₁) / |r₂ - r₁|
+        F₁₂ = G * m₁ * m₂ / (|r₂ - r₁|² + ε²)^(3/2) * (r₂ - r₁)
 
-    The direction of the force is from body 1 toward body 2.
+    The direction of the force is from body 1 toward body 2. Any positive
+    softening keeps the force finite (zero) for coincident bodies, so no
+    distance check is needed; with ``softening=0`` their force is NaN.
+
+    This is a scalar reference helper for a single pair of bodies; the
+    simulation itself uses the vectorized :func:`compute_accelerations`.
 
     Examples
     --------
@@ -59,15 +67,15 @@ def gravitational_force(r1, r2, m1, m2):
     >>> gravitational_force(r1, r2, m1, m2)
     array([3.33715e-10, 0.00000e+00])
     """
-    diff = r2 - r1
-    dist = np.linalg.norm(diff)
-
-    if dist < epsilon:
-        raise ValueError(f"Distance too small: {dist} < {epsilon}")
-
-    force_mag = G * m1 * m2 / dist**2
-    force_vec = force_mag * diff / dist
-    return force_vec
+    # Plain float arithmetic on the two components avoids NumPy dispatch
+    dx = float(r2[0]) - float(r1[0])
+    dy = float(r2[1]) - float(r1[1])
+    dist2 = dx * dx + dy * dy + softening * softening
+    if dist2 == 0.0:
+        # Unsoftened coincident bodies: the force is undefined
+        return np.array([math.nan, math.nan])
+    f = G * m1 * m2 * dist2**-1.5
+    return np.array([f * dx, f * dy])
 
 
 def compute_accelerations(positions, masses, G=G):
@@ -95,10 +103,15 @@ def compute_accelerations(positions, masses, G=G):
     all bodies (O(N²) complexity). For each pair (i, j), the acceleration on `i`
     due to `j` is:
 
-        aᵢⱼ = G * mⱼ / |rⱼ - rᵢ|³ * (rⱼ - rᵢ)
+        aᵢⱼ = G * mⱼ / (|rⱼ - rᵢ|² + ε²)^(3/2) * (rⱼ - rᵢ)
 
     Then the total acceleration on body `i` is the sum of all `aᵢⱼ` for j ≠ i.
 
+    The summation is fully vectorized with NumPy broadcasting over an (N, N, 2)
+    array of pairwise separations; self-interaction is masked by zeroing the
+    diagonal of the inverse-cube distance matrix. For large N the rows are
+    processed in chunks of about `PAIR_CHUNK` pairs to bound memory use.
+
     Examples
     --------
     >>> positions = np.array([[0, 0], [1, 0]], dtype=float)
@@ -107,14 +120,93 @@ def compute_accelerations(positions, masses, G=G):
     array([[3.99e-14, 0.00e+00],
            [-6.64e-03, 0.00e+00]])
     """
-    N = len(positions)
-    acc = np.zeros_like(positions)
+    acc = np.empty(np.shape(positions), dtype=np.result_type(positions, masses, 1.0))
+    return compute_accelerations_into(positions, masses, G, acc)
+
+
+def compute_accelerations_into(positions, masses, G, out):
+    """
+    Compute the net gravitational accelerations into a caller-supplied buffer.
+
+    Same computation as :func:`compute_accelerations`, but the result is
+    written to `out`, so that integrators can reuse one buffer across steps.
+    For C-contiguous float64 positions, masses and `out`, the optional C kernel
+    (`_nbody_c.c`) is used when it has been built; otherwise the sum is
+    evaluated with NumPy broadcasting.
 
-    for i in range(N):
-        for j in range(N):
-            if i != j:
-                acc[i] += gravitational_force(
-                    positions[i], positions[j], masses[i], masses[j]
-                ) / masses[i]
+    Parameters
+    ----------
+    positions : numpy.ndarray of shape (N, 2)
+        Array of 2D position vectors for all bodies [m].
+    masses : numpy.ndarray of shape (N,)
+        Masses of all bodies [kg].
+    G : float
+        Gravitational constant [m³ kg⁻¹ s⁻²].
+    out : numpy.ndarray of shape (N, 2)
+        Output buffer for the accelerations [m/s²].
+
+    Returns
+    -------
+    out : numpy.ndarray of shape (N, 2)
+        The `out` buffer, filled with the net acceleration of each body.
+    """
+    if _cnbody.supports(positions, masses, out):
+        return _cnbody.accel2d(positions, masses, G, epsilon * epsilon, out)
 
-    return acc
+    # Rows of the (N, N, 2) pair array are processed in chunks, so that the
+    # temporaries stay bounded (about PAIR_CHUNK pairs) for large N.
+    n = len(positions)
+    rows = max(1, PAIR_CHUNK // max(n, 1))
+
+    for i0 in range(0, n, rows):
+        i1 = min(i0 + rows, n)
+
+        # diff[r, j] = r_j - r_(i0 + r). The chunk is upcast to float64, so
+        # that distances, pair terms and the sum over j are all evaluated in
+        # float64 even for float32 storage: in SI units, r⁻³ underflows
+        # float32 at planetary distances.
+        diff = np.subtract(positions[None, :, :], positions[i0:i1, None, :],
+                           dtype=np.float64)
+
+        r2 = (diff * diff).sum(axis=-1) + epsilon * epsilon
+        inv_r3 = r2**-1.5
+        inv_r3[np.arange(i1 - i0), np.arange(i0, i1)] = 0.0
+
+        inv_r3 *= masses[None, :]
+        diff *= inv_r3[..., None]
+        np.sum(diff, axis=1, dtype=np.float64, out=out[i0:i1])
+
+    out *= G
+    return out
+
+
+def center_of_gravity(trajectories, masses):
+    """
+    Compute the center of gravity (CoG) of the system at every step.
+
+    Parameters
+    ----------
+    trajectories : numpy.ndarray of shape (steps, N, 2)
+        Positions of all bodies at every step [m].
+    masses : numpy.ndarray of shape (N,)
+        Masses of all bodies [kg].
+
+    Returns
+    -------
+    cog : numpy.ndarray of shape (steps, 2)
+        Center-of-gravity position at every step [m].
+
+    Notes
+    -----
+    .. math::
+        \\mathbf{r}_{\\mathrm{CoG}}(t) = \\frac{\\sum_i m_i \\mathbf{r}_i(t)}{\\sum_i m_i}
+
+    All steps are reduced in a single `einsum` call rather than one weighted
+    sum per step. The reduction is done in float64 even for float32 storage:
+    in SI units, mᵢ rᵢ overflows float32 for the giant planets. The result is
+    returned in the dtype of `trajectories`.
+    """
+    inv_total_mass = 1.0 / masses.sum(dtype=np.float64)
+    cog = np.einsum("i,sij->sj", masses, trajectories, dtype=np.float64)
+    cog *= inv_total_mass
+    return cog.astype(trajectories.dtype, copy=False)
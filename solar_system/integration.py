@@ -3,35 +3,95 @@ integration.py
 
 Numerical integration schemes for updating positions and velocities
 in the 2D N-body Solar System simulation.
+
+All step functions advance the state arrays in place, so that no new state
+arrays are allocated per step. `euler_step` and `rk4_step` can instead write
+the new state into caller-supplied `out_pos`/`out_vel` buffers, and return
+the arrays they wrote to.
 """
 
 import numpy as np
-from .dynamics import compute_accelerations
+from .dynamics import compute_accelerations, compute_accelerations_into
+
+
+class RK4Scratch:
+    """
+    Preallocated work arrays for :func:`rk4_step`.
+
+    Allocating one instance before the time loop and passing it to every
+    `rk4_step` call avoids creating the stage arrays anew at each step.
+
+    Parameters
+    ----------
+    positions : ndarray, shape (N, 2)
+        Template array giving the shape and dtype of the buffers.
+    """
+
+    __slots__ = ("k1x", "k1v", "k2x", "k2v", "k3x", "k3v", "k4x", "k4v",
+                 "tmp_pos", "acc")
+
+    def __init__(self, positions):
+        for name in self.__slots__:
+            setattr(self, name, np.empty_like(positions))
+
+
+class DOPRI5Scratch:
+    """
+    Preallocated work arrays for :func:`dopri5_step`.
+
+    Parameters
+    ----------
+    positions : ndarray, shape (N, 2)
+        Template array giving the shape and dtype of the buffers.
+    """
+
+    __slots__ = ("kx", "kv", "tmp_pos", "tmp")
+
+    def __init__(self, positions):
+        self.kx = np.empty((7,) + positions.shape, dtype=positions.dtype)
+        self.kv = np.empty((7,) + positions.shape, dtype=positions.dtype)
+        self.tmp_pos = np.empty_like(positions)
+        self.tmp = np.empty_like(positions)
+
 
+# Dormand–Prince 5(4) coefficients a_ij, row i giving stage i + 1. The last
+# row equals the 5th-order weights, so the last stage is evaluated at the new
+# state: this is the "first same as last" property used by `dopri5_step`.
+DOPRI5_A = np.array([
+    [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+    [1 / 5, 0.0, 0.0, 0.0, 0.0, 0.0],
+    [3 / 40, 9 / 40, 0.0, 0.0, 0.0, 0.0],
+    [44 / 45, -56 / 15, 32 / 9, 0.0, 0.0, 0.0],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729, 0.0, 0.0],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656, 0.0],
+    [35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+])
 
-def euler_step(positions, velocities, masses, dt, G):
+
+def euler_step(positions, velocities, masses, dt, G, out_pos=None, out_vel=None):
     """
     Advance one time step using the explicit Euler method.
 
     Parameters
     ----------
     positions : ndarray, shape (N, 2)
-        Current positions [m].
+        Current positions [m], updated in place.
     velocities : ndarray, shape (N, 2)
-        Current velocities [m/s].
+        Current velocities [m/s], updated in place.
     masses : ndarray, shape (N,)
         Masses [kg].
     dt : float
         Time step [s].
     G : float
         Gravitational constant [m³ kg⁻¹ s⁻²].
+    out_pos, out_vel : ndarray, shape (N, 2), optional
+        Buffers receiving the new positions and velocities. Default to
+        `positions` and `velocities`, i.e. the step is done in place.
 
     Returns
     -------
-    new_positions : ndarray, shape (N, 2)
-        Updated positions [m].
-    new_velocities : ndarray, shape (N, 2)
-        Updated velocities [m/s].
+    out_pos, out_vel : ndarray, shape (N, 2)
+        The updated positions [m] and velocities [m/s].
 
     Notes
     -----
@@ -41,35 +101,45 @@ def euler_step(positions, velocities, masses, dt, G):
         v_{n+1} = v_n + a_n \, \Delta t \\
         x_{n+1} = x_n + v_{n+1} \, \Delta t
     """
+    out_pos = positions if out_pos is None else out_pos
+    out_vel = velocities if out_vel is None else out_vel
+
     acc = compute_accelerations(positions, masses, G)
-    new_velocities = velocities + acc * dt
-    new_positions = positions + new_velocities * dt
-    return new_positions, new_velocities
+    np.multiply(acc, dt, out=acc)
+    np.add(velocities, acc, out=out_vel)
+    np.multiply(out_vel, dt, out=acc)
+    np.add(positions, acc, out=out_pos)
+    return out_pos, out_vel
 
 
-def rk4_step(positions, velocities, masses, dt, G):
+def rk4_step(positions, velocities, masses, dt, G, scratch=None,
+             out_pos=None, out_vel=None):
     """
     Advance one time step using the 4th-order Runge–Kutta (RK4) integrator.
 
     Parameters
     ----------
     positions : ndarray, shape (N, 2)
-        Current positions [m].
+        Current positions [m], updated in place.
     velocities : ndarray, shape (N, 2)
-        Current velocities [m/s].
+        Current velocities [m/s], updated in place.
     masses : ndarray, shape (N,)
         Masses [kg].
     dt : float
         Time step [s].
     G : float
         Gravitational constant [m³ kg⁻¹ s⁻²].
+    scratch : RK4Scratch, optional
+        Preallocated stage buffers, reused across calls. Allocated on the fly
+        if not given.
+    out_pos, out_vel : ndarray, shape (N, 2), optional
+        Buffers receiving the new positions and velocities. Default to
+        `positions` and `velocities`, i.e. the step is done in place.
 
     Returns
     -------
-    new_positions : ndarray, shape (N, 2)
-        Updated positions [m].
-    new_velocities : ndarray, shape (N, 2)
-        Updated velocities [m/s].
+    out_pos, out_vel : ndarray, shape (N, 2)
+        The updated positions [m] and velocities [m/s].
 
     Notes
     -----
@@ -82,26 +152,152 @@ def rk4_step(positions, velocities, masses, dt, G):
         k_4 = f(t_n + \Delta t, y_n + \Delta t k_3) \\
         y_{n+1} = y_n + \tfrac{\Delta t}{6}(k_1 + 2k_2 + 2k_3 + k_4)
     """
+    scr = scratch if scratch is not None else RK4Scratch(positions)
+
     # k1
-    a1 = compute_accelerations(positions, masses, G)
-    k1v = a1 * dt
-    k1x = velocities * dt
+    compute_accelerations_into(positions, masses, G, scr.acc)
+    np.multiply(scr.acc, dt, out=scr.k1v)
+    np.multiply(velocities, dt, out=scr.k1x)
 
     # k2
-    a2 = compute_accelerations(positions + 0.5 * k1x, masses, G)
-    k2v = a2 * dt
-    k2x = (velocities + 0.5 * k1v) * dt
+    np.multiply(scr.k1x, 0.5, out=scr.tmp_pos)
+    np.add(scr.tmp_pos, positions, out=scr.tmp_pos)
+    compute_accelerations_into(scr.tmp_pos, masses, G, scr.acc)
+    np.multiply(scr.acc, dt, out=scr.k2v)
+    np.multiply(scr.k1v, 0.5, out=scr.k2x)
+    np.add(scr.k2x, velocities, out=scr.k2x)
+    np.multiply(scr.k2x, dt, out=scr.k2x)
 
     # k3
-    a3 = compute_accelerations(positions + 0.5 * k2x, masses, G)
-    k3v = a3 * dt
-    k3x = (velocities + 0.5 * k2v) * dt
+    np.multiply(scr.k2x, 0.5, out=scr.tmp_pos)
+    np.add(scr.tmp_pos, positions, out=scr.tmp_pos)
+    compute_accelerations_into(scr.tmp_pos, masses, G, scr.acc)
+    np.multiply(scr.acc, dt, out=scr.k3v)
+    np.multiply(scr.k2v, 0.5, out=scr.k3x)
+    np.add(scr.k3x, velocities, out=scr.k3x)
+    np.multiply(scr.k3x, dt, out=scr.k3x)
 
     # k4
-    a4 = compute_accelerations(positions + k3x, masses, G)
-    k4v = a4 * dt
-    k4x = (velocities + k3v) * dt
+    np.add(positions, scr.k3x, out=scr.tmp_pos)
+    compute_accelerations_into(scr.tmp_pos, masses, G, scr.acc)
+    np.multiply(scr.acc, dt, out=scr.k4v)
+    np.add(velocities, scr.k3v, out=scr.k4x)
+    np.multiply(scr.k4x, dt, out=scr.k4x)
+
+    # (k1 + 2*k2 + 2*k3 + k4) / 6, accumulated in the k2 buffers
+    for k1, k2, k3, k4 in ((scr.k1x, scr.k2x, scr.k3x, scr.k4x),
+                           (scr.k1v, scr.k2v, scr.k3v, scr.k4v)):
+        k2 += k3
+        k2 *= 2
+        k2 += k1
+        k2 += k4
+        k2 /= 6
+
+    out_pos = positions if out_pos is None else out_pos
+    out_vel = velocities if out_vel is None else out_vel
+    np.add(positions, scr.k2x, out=out_pos)
+    np.add(velocities, scr.k2v, out=out_vel)
+    return out_pos, out_vel
+
+
+def verlet_step(positions, velocities, acc, masses, dt, G):
+    """
+    Advance one time step using the velocity Verlet (leapfrog) integrator.
+
+    Parameters
+    ----------
+    positions : ndarray, shape (N, 2)
+        Current positions [m], updated in place.
+    velocities : ndarray, shape (N, 2)
+        Current velocities [m/s], updated in place.
+    acc : ndarray, shape (N, 2)
+        Accelerations at the current positions [m/s²]. On return it holds the
+        accelerations at the updated positions, ready for the next step, so it
+        only needs to be computed with `compute_accelerations` before the
+        first step.
+    masses : ndarray, shape (N,)
+        Masses [kg].
+    dt : float
+        Time step [s].
+    G : float
+        Gravitational constant [m³ kg⁻¹ s⁻²].
+
+    Notes
+    -----
+    Velocity Verlet scheme (2nd order, symplectic):
+
+    .. math::
+        v_{n+1/2} = v_n + \\tfrac{1}{2} a_n \\Delta t \\\\
+        x_{n+1} = x_n + v_{n+1/2} \\Delta t \\\\
+        v_{n+1} = v_{n+1/2} + \\tfrac{1}{2} a_{n+1} \\Delta t
+
+    Only one acceleration evaluation is needed per step, and the energy
+    error stays bounded over long integrations instead of drifting.
+    """
+    velocities += 0.5 * dt * acc
+    positions += dt * velocities
+    compute_accelerations_into(positions, masses, G, acc)
+    velocities += 0.5 * dt * acc
+
+
+def dopri5_step(positions, velocities, acc, masses, dt, G, scratch=None):
+    """
+    Advance one time step using the 5th-order Dormand–Prince method.
+
+    Parameters
+    ----------
+    positions : ndarray, shape (N, 2)
+        Current positions [m], updated in place.
+    velocities : ndarray, shape (N, 2)
+        Current velocities [m/s], updated in place.
+    acc : ndarray, shape (N, 2)
+        Accelerations at the current positions [m/s²]. As for
+        :func:`verlet_step`, on return it holds the accelerations at the
+        updated positions.
+    masses : ndarray, shape (N,)
+        Masses [kg].
+    dt : float
+        Time step [s].
+    G : float
+        Gravitational constant [m³ kg⁻¹ s⁻²].
+    scratch : DOPRI5Scratch, optional
+        Preallocated stage buffers, reused across calls. Allocated on the fly
+        if not given.
+
+    Notes
+    -----
+    Dormand–Prince scheme (5th order, 7 stages), with coefficients
+    `DOPRI5_A`:
+
+    .. math::
+        y_i = y_n + \\Delta t \\sum_{j<i} a_{ij} k_j, \\quad k_i = f(y_i) \\\\
+        y_{n+1} = y_7
+
+    The first stage of a step is the last stage of the previous one, so only
+    six acceleration evaluations are needed per step. The step size is kept
+    fixed; the embedded 4th-order error estimate is not used.
+    """
+    scr = scratch if scratch is not None else DOPRI5Scratch(positions)
+    kx, kv = scr.kx, scr.kv
+
+    # Stage 1 is reused from the previous step
+    kx[0] = velocities
+    kv[0] = acc
+
+    for i in range(1, 7):
+        scr.tmp_pos[...] = positions
+        kx[i] = velocities
+        for j in range(i):
+            a = dt * DOPRI5_A[i, j]
+            if a == 0.0:
+                continue
+            np.multiply(kx[j], a, out=scr.tmp)
+            scr.tmp_pos += scr.tmp
+            np.multiply(kv[j], a, out=scr.tmp)
+            kx[i] += scr.tmp
+        compute_accelerations_into(scr.tmp_pos, masses, G, kv[i])
 
-    new_positions = positions + (k1x + 2*k2x + 2*k3x + k4x) / 6
-    new_velocities = velocities + (k1v + 2*k2v + 2*k3v + k4v) / 6
-    return new_positions, new_velocities
+    # The last stage is the new state
+    positions[...] = scr.tmp_pos
+    velocities[...] = kx[6]
+    acc[...] = kv[6]
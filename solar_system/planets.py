@@ -22,8 +22,14 @@ PLANETS = [
     {"name": "Neptune", "mass": 1.024e26, "r": 4.503e12, "v": 5430},
 ]
 
+# Structure-of-arrays view of PLANETS, built once at import time
+_NAMES = [p["name"] for p in PLANETS]
+_MASSES = np.array([p["mass"] for p in PLANETS])
+_R = np.array([p["r"] for p in PLANETS])
+_V = np.array([p["v"] for p in PLANETS])
 
-def get_planets(nplanets):
+
+def get_planets(nplanets, dtype=np.float64):
     """
     Return initial conditions for the first `nplanets` in the PLANETS list.
 
@@ -35,6 +41,9 @@ def get_planets(nplanets):
     nplanets : int
         Number of planets to include, counting from the Sun outward.
         If greater than the number of entries in `PLANETS`, it will be truncated.
+    dtype : numpy dtype, default=np.float64
+        Floating-point type of the returned arrays. `np.float32` halves memory
+        traffic for large systems, at the cost of precision.
 
     Returns
     -------
@@ -54,16 +63,12 @@ def get_planets(nplanets):
     - This setup neglects mutual perturbations, using approximate circular velocities.
     """
     nplanets = min(nplanets, len(PLANETS))
-    subset = PLANETS[:nplanets]
-
-    names = [p["name"] for p in subset]
-    masses = np.array([p["mass"] for p in subset])
-    positions = np.zeros((nplanets, 2))
-    velocities = np.zeros((nplanets, 2))
 
-    for i, p in enumerate(subset):
-        # Place planets on x-axis, with counterclockwise circular velocity
-        positions[i] = np.array([p["r"], 0.0])
-        velocities[i] = np.array([0.0, p["v"]])
+    # Place planets on x-axis, with counterclockwise circular velocity
+    positions = np.zeros((nplanets, 2), dtype=dtype)
+    positions[:, 0] = _R[:nplanets]
+    velocities = np.zeros((nplanets, 2), dtype=dtype)
+    velocities[:, 1] = _V[:nplanets]
+    masses = _MASSES[:nplanets].astype(dtype)
 
-    return names, masses, positions, velocities
+    return _NAMES[:nplanets], masses, positions, velocities
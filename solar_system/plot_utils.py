@@ -3,11 +3,40 @@ plot_utils.py
 
 Visualization utilities for 2D N-body Solar System simulations.
 Provides trajectory and time-series plotting functions.
+
+Matplotlib is imported on first use, so importing this module (or the rest of
+the package) stays cheap for numerical work.
 """
 
-import matplotlib.pyplot as plt
+import os
+import sys
+
 import numpy as np
 
+# Maximum number of points drawn per orbit in `plot_trajectories`
+MAX_ORBIT_POINTS = 2000
+
+# rcParams applied while plotting only: merge nearly collinear segments of
+# long trajectories before rendering
+_RC = {"path.simplify_threshold": 1.0}
+
+
+def _pyplot(show):
+    """
+    Import and return `matplotlib.pyplot`.
+
+    If the figure is only saved to disk, pyplot has not been imported yet and
+    no backend is requested through `MPLBACKEND`, the non-interactive Agg
+    backend is selected, which avoids GUI start-up. A backend already in use
+    by the user or a host application is left untouched.
+    """
+    import matplotlib
+    if (not show and "matplotlib.pyplot" not in sys.modules
+            and not os.environ.get("MPLBACKEND")):
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
 
 def plot_trajectories(trajectories, labels=None, savefile=None, show=True):
     """
@@ -15,8 +44,8 @@ def plot_trajectories(trajectories, labels=None, savefile=None, show=True):
 
     Parameters
     ----------
-    trajectories : list of ndarray
-        List of arrays, each of shape (steps, 2), giving the (x, y) coordinates of each body.
+    trajectories : ndarray, shape (steps, N, 2)
+        (x, y) coordinates of each of the N bodies at every step.
     labels : list of str, optional
         Names or identifiers for each trajectory.
     savefile : str, optional
@@ -30,31 +59,35 @@ def plot_trajectories(trajectories, labels=None, savefile=None, show=True):
 
     .. math::
         r_i(t) = (x_i(t), y_i(t))
+
+    Long trajectories are downsampled to at most about `MAX_ORBIT_POINTS`
+    points per body, which is indistinguishable at the saved resolution.
     """
-    plt.figure(figsize=(6, 6))
-    for i, traj in enumerate(trajectories):
-        x, y = traj[:, 0], traj[:, 1]
+    plt = _pyplot(show)
+    stride = max(1, trajectories.shape[0] // MAX_ORBIT_POINTS)
+
+    with plt.rc_context(_RC):
+        plt.figure(figsize=(6, 6))
+        for i in range(trajectories.shape[1]):
+            x, y = trajectories[::stride, i, 0], trajectories[::stride, i, 1]
+            if labels:
+                plt.plot(x, y, label=labels[i], antialiased=True, linewidth=1.0)
+            else:
+                plt.plot(x, y, antialiased=True, linewidth=1.0)
+
+        plt.xlabel("x [m]")
+        plt.ylabel("y [m]")
+        plt.axis("equal")
         if labels:
-            plt.plot(x, y, label=labels[i])
-        else:
-            plt.plot(x, y)
-
-    plt.xlabel("x [m]")
-    plt.ylabel("y [m]")
-    plt.axis("equal")
-    if labels:
-        plt.legend()
-    plt.grid(True, linestyle="--", alpha=0.5)
-
-    if savefile:
-        plt.savefig(savefile, dpi=150)
-    if show:
-        plt.show()
-    else:
-        plt.close()
-
-
+            plt.legend()
+        plt.grid(True, linestyle="--", alpha=0.5)
 
+        if savefile:
+            plt.savefig(savefile, dpi=150)
+        if show:
+            plt.show()
+        else:
+            plt.close()
 
 
 def plot_timeseries(time, trajectories, labels=None, cog_positions=None,
@@ -66,8 +99,8 @@ def plot_timeseries(time, trajectories, labels=None, cog_positions=None,
     ----------
     time : ndarray, shape (steps,)
         Time array [s].
-    trajectories : list of ndarray
-        List of arrays, each of shape (steps, 2), giving the (x, y) coordinates of each body.
+    trajectories : ndarray, shape (steps, N, 2)
+        (x, y) coordinates of each of the N bodies at every step.
     labels : list of str, optional
         Names or identifiers for each body.
     cog_positions : ndarray, shape (steps, 2), optional
@@ -89,40 +122,43 @@ def plot_timeseries(time, trajectories, labels=None, cog_positions=None,
     .. math::
         r_{\\mathrm{CoG}}(t) = \\frac{\\sum_i m_i r_i(t)}{\\sum_i m_i}
     """
-    n = len(trajectories)
+    plt = _pyplot(show)
+    n = trajectories.shape[1]
     n_subplots = n + 1 if cog_positions is not None else n
-    fig, axes = plt.subplots(n_subplots, 1, figsize=(8, 2 * n_subplots), sharex=True)
-
-    if n_subplots == 1:
-        axes = [axes]
-
-    # --- Plot planets ---
-    for i, traj in enumerate(trajectories):
-        x, y = traj[:, 0], traj[:, 1]
-        axes[i].plot(time, x, label="x")
-        axes[i].plot(time, y, label="y")
-        axes[i].set_ylabel("Position [m]")
-        axes[i].legend()
-        if labels:
-            axes[i].set_title(labels[i])
-        axes[i].grid(True, linestyle="--", alpha=0.5)
-
-    # --- Plot CoG if available ---
-    if cog_positions is not None:
-        ax_cog = axes[-1]
-        ax_cog.plot(time, cog_positions[:, 0], "--", color="k", label="CoG x")
-        ax_cog.plot(time, cog_positions[:, 1], "--", color="r", label="CoG y")
-        ax_cog.set_ylabel("Position [m]")
-        ax_cog.set_title("Center of Gravity")
-        ax_cog.legend()
-        ax_cog.grid(True, linestyle="--", alpha=0.5)
-
-    axes[-1].set_xlabel("Time [s]")
-    fig.tight_layout()
-
-    if savefile:
-        plt.savefig('./outputs/'+savefile, dpi=150)
-    if show:
-        plt.show()
-    else:
-        plt.close()
+
+    with plt.rc_context(_RC):
+        fig, axes = plt.subplots(n_subplots, 1, figsize=(8, 2 * n_subplots), sharex=True)
+
+        if n_subplots == 1:
+            axes = [axes]
+
+        # --- Plot planets ---
+        for i in range(n):
+            x, y = trajectories[:, i, 0], trajectories[:, i, 1]
+            axes[i].plot(time, x, label="x")
+            axes[i].plot(time, y, label="y")
+            axes[i].set_ylabel("Position [m]")
+            axes[i].legend()
+            if labels:
+                axes[i].set_title(labels[i])
+            axes[i].grid(True, linestyle="--", alpha=0.5)
+
+        # --- Plot CoG if available ---
+        if cog_positions is not None:
+            ax_cog = axes[-1]
+            ax_cog.plot(time, cog_positions[:, 0], "--", color="k", label="CoG x")
+            ax_cog.plot(time, cog_positions[:, 1], "--", color="r", label="CoG y")
+            ax_cog.set_ylabel("Position [m]")
+            ax_cog.set_title("Center of Gravity")
+            ax_cog.legend()
+            ax_cog.grid(True, linestyle="--", alpha=0.5)
+
+        axes[-1].set_xlabel("Time [s]")
+        fig.tight_layout()
+
+        if savefile:
+            plt.savefig('./outputs/'+savefile, dpi=100)
+        if show:
+            plt.show()
+        else:
+            plt.close()
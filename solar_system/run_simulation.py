@@ -5,21 +5,27 @@ Main simulation and plotting logic for the 2D N-body Solar System.
 """
 
 import numpy as np
-from .dynamics import compute_accelerations
-from .integration import euler_step, rk4_step
+from functools import partial
+from .dynamics import compute_accelerations, center_of_gravity
+from .integration import (euler_step, rk4_step, verlet_step, dopri5_step,
+                          RK4Scratch, DOPRI5Scratch)
 from .plot_utils import plot_trajectories, plot_timeseries
 from .planets import get_planets, G
+from . import _kernels
 
 
 def run_simulation(
     nplanets=2,
     steps=365,
     dt=60 * 60 * 24,
-    method="rk4",
+    method="verlet",
     outfile="orbits.png",
     timeseries="timeseries.png",
     show=False,
     include_cog=False,
+    dtype=np.float64,
+    force="direct",
+    theta=0.5,
 ):
     """
     Run a 2D Solar System simulation and produce orbit and time-series plots.
@@ -32,8 +38,10 @@ def run_simulation(
         Number of integration time steps.
     dt : float, default=60*60*24
         Time step [s].
-    method : {'rk4', 'euler'}, default='rk4'
-        Integration method to use.
+    method : {'verlet', 'rk4', 'dopri5', 'euler'}, default='verlet'
+        Integration method to use. Velocity Verlet needs a single force
+        evaluation per step and has bounded long-term energy error;
+        'dopri5' is the most accurate per step.
     outfile : str, default='orbits.png'
         Filename for saving the orbit plot.
     timeseries : str, default='timeseries.png'
@@ -42,6 +50,17 @@ def run_simulation(
         If True, display the plots interactively.
     include_cog : bool, default=False
         If True, compute and plot the center of gravity (CoG).
+    dtype : numpy dtype, default=np.float64
+        Storage type of positions, velocities and trajectories. `np.float32`
+        halves memory traffic and is only worthwhile for large N; pairwise
+        accelerations are still accumulated in float64.
+    force : {'direct', 'bh'}, default='direct'
+        How accelerations are computed: exact pairwise summation, or the
+        O(N log N) Barnes–Hut approximation of `barneshut`, which only pays
+        off for systems of several hundred bodies and requires Numba.
+    theta : float, default=0.5
+        Barnes–Hut opening angle, must be positive; ignored for
+        ``force='direct'``.
 
     Notes
     -----
@@ -51,43 +70,73 @@ def run_simulation(
         \\mathbf{r}_{\\mathrm{CoG}}(t) = \\frac{\\sum_i m_i \\mathbf{r}_i(t)}{\\sum_i m_i}
     """
     # --- 1. Initialize system ---
-    names, masses, positions, velocities = get_planets(nplanets)
-
-    # --- 2. Prepare storage ---
-    trajectories = [np.zeros((steps + 1, 2)) for _ in range(nplanets)]
-    for i in range(nplanets):
-        trajectories[i][0] = positions[i]
-
+    names, masses, positions, velocities = get_planets(nplanets, dtype=dtype)
+
+    n = len(masses)
+
+    # --- 2. Check options ---
+    if method not in _kernels.METHOD_IDS:
+        raise ValueError("Unknown method. Choose 'verlet', 'rk4', 'dopri5' or 'euler'.")
+
+    if force == "bh":
+        if not theta > 0:
+            raise ValueError("theta must be positive for force='bh'.")
+        if not _kernels.HAVE_NUMBA:
+            # Interpreted, the tree walk is far slower than direct summation
+            raise RuntimeError("force='bh' requires Numba; install it or use force='direct'.")
+    elif force != "direct":
+        raise ValueError("Unknown force. Choose 'direct' or 'bh'.")
+
+    # --- 3. Main time loop ---
+    if force == "bh":
+        trajectories = _kernels.run_loop_bh(
+            positions, velocities, masses, dt, G, steps, _kernels.METHOD_IDS[method], theta
+        )
+    elif _kernels.HAVE_NUMBA:
+        # The whole loop runs in compiled code: one call instead of one per step.
+        trajectories = _kernels.run_loop(
+            positions, velocities, masses, dt, G, steps, _kernels.METHOD_IDS[method]
+        )
+    else:
+        # Select the NumPy integrator; stage buffers are allocated once and
+        # reused at every step
+        if method == "verlet":
+            step_func = verlet_step
+        elif method == "euler":
+            step_func = euler_step
+        elif method == "rk4":
+            step_func = partial(rk4_step, scratch=RK4Scratch(positions))
+        else:
+            step_func = partial(dopri5_step, scratch=DOPRI5Scratch(positions))
+
+        trajectories = np.empty((steps + 1, n, 2), dtype=dtype)
+        trajectories[0] = positions
+
+        # Verlet and DOPRI5 carry the accelerations from one step to the next
+        carries_acc = method in ("verlet", "dopri5")
+        if carries_acc:
+            acc = compute_accelerations(positions, masses, G)
+
+        for step in range(1, steps + 1):
+            if carries_acc:
+                step_func(positions, velocities, acc, masses, dt, G)
+            else:
+                step_func(positions, velocities, masses, dt, G)
+            trajectories[step] = positions
+
+    # The CoG does not feed back into the dynamics, so it is computed once
+    # from the full trajectory after the loop.
     cog_positions = None
     if include_cog:
-        cog_positions = np.zeros((steps + 1, 2))
-        cog_positions[0] = np.sum(masses[:, None] * positions, axis=0) / np.sum(masses)
-
-    # --- 3. Select integrator ---
-    if method == "euler":
-        step_func = euler_step
-    elif method == "rk4":
-        step_func = rk4_step
-    else:
-        raise ValueError("Unknown method. Choose 'rk4' or 'euler'.")
-
-    # --- 4. Main time loop ---
-    for step in range(1, steps + 1):
-        positions, velocities = step_func(positions, velocities, masses, dt, G)
-
-        for i in range(nplanets):
-            trajectories[i][step] = positions[i]
-
-        if include_cog:
-            cog_positions[step] = np.sum(masses[:, None] * positions, axis=0) / np.sum(masses)
+        cog_positions = center_of_gravity(trajectories, masses)
 
-    # --- 5. Plot results ---
+    # --- 4. Plot results ---
     labels = names
     time = np.arange(steps + 1) * dt
 
     plot_trajectories(trajectories, labels=labels, savefile=outfile, show=show)
     plot_timeseries(time, trajectories, labels=labels,
-                    cog_positions=cog_positions if include_cog else None,
+                    cog_positions=cog_positions,
                     savefile=timeseries, show=show)
 
     print(f"✅ Simulation complete — orbit plot saved to '{outfile}', time series saved to '{timeseries}'.")
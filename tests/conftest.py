@@ -2,7 +2,22 @@
 import os
 import sys
 
+import numpy as np
+import pytest
+
 # Ensure project root (parent of tests/) is in sys.path
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _warmup():
+    """Call each step function once on a 2-body state, once per (xdist) worker."""
+    from solar_system.integration import euler_step, rk4_step
+
+    masses = np.array([1.0, 1.0])
+    for step_fn in (euler_step, rk4_step):
+        positions = np.array([[0.0, 0.0], [1.0, 0.0]])
+        velocities = np.array([[0.0, 0.0], [0.0, 1.0]])
+        step_fn(positions, velocities, masses, 0.1, 1.0)
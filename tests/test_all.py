@@ -1,44 +1,130 @@
+import functools
+import math
+import warnings
+
 import numpy as np
 import pytest
 
-from solar_system.dynamics import gravitational_force, compute_accelerations
+from solar_system.dynamics import (gravitational_force, compute_accelerations,
+                                   center_of_gravity, epsilon)
 from solar_system.planets import get_planets, PLANETS
-from solar_system.integration import euler_step, rk4_step
+from solar_system.integration import euler_step, rk4_step, verlet_step, dopri5_step, RK4Scratch
+
+# Shared read-only inputs; copy before passing to anything that mutates
+_R1 = np.array([0.0, 0.0])
+_R2 = np.array([1.0, 0.0])
+_POS2 = np.array([[0.0, 0.0], [1.0, 0.0]])
+_M2 = np.array([1.0, 1.0])
+for _arr in (_R1, _R2, _POS2, _M2):
+    _arr.flags.writeable = False
 
 # --- Dynamics tests ---
 
 def test_gravitational_force_magnitude():
-    r1 = np.array([0.0, 0.0])
-    r2 = np.array([1.0, 0.0])
-    f = gravitational_force(r1, r2, 1.0, 1.0)
+    f = gravitational_force(_R1, _R2, 1.0, 1.0)
     expected = 6.67430e-11  # G * m1 * m2 / r^2
-    assert np.allclose(np.linalg.norm(f), expected)
+    assert math.isclose(math.hypot(float(f[0]), float(f[1])), expected, rel_tol=1e-9)
 
 def test_gravitational_force_zero_distance():
-    r1 = np.array([0.0, 0.0])
-    r2 = np.array([0.0, 0.0])
-    with pytest.raises(ValueError):
-        gravitational_force(r1, r2, 1.0, 1.0)
+    f = gravitational_force(_R1, _R1, 1.0, 1.0, softening=1e-9)
+    # Softening keeps the force finite for coincident bodies
+    assert np.isfinite(f).all()
+    assert np.allclose(f, 0.0)
+
+def test_gravitational_force_zero_distance_unsoftened():
+    # No softening: coincident bodies give NaN, without raising or warning
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        f = gravitational_force(_R1, _R1, 1.0, 1.0, softening=0.0)
+    assert np.isnan(f).all()
+
+def test_gravitational_force_near_coincident_softened():
+    # Separation far below the softening length: finite and antisymmetric
+    r2 = np.array([1e-12, -3e-13])
+    f12 = gravitational_force(_R1, r2, 1.0, 1.0, softening=1e-6)
+    f21 = gravitational_force(r2, _R1, 1.0, 1.0, softening=1e-6)
+    assert np.isfinite(f12).all()
+    assert np.array_equal(f12, -f21)
+    assert f12[0] > 0.0  # still attractive, towards body 2
 
-def test_compute_accelerations_two_body_symmetry():
-    positions = np.array([[0.0, 0.0], [1.0, 0.0]])
-    masses = np.array([1.0, 1.0])
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_compute_accelerations_two_body_symmetry(dtype):
+    positions = np.ascontiguousarray(_POS2, dtype=dtype)
+    masses = np.ascontiguousarray(_M2, dtype=dtype)
+    rtol = 1e-5 if dtype == np.float32 else 1e-12
     acc = compute_accelerations(positions, masses, G=6.67430e-11)
     # accelerations should be equal in magnitude and opposite
-    assert np.allclose(acc[0], -acc[1])
-    assert np.isclose(np.linalg.norm(acc[0]), np.linalg.norm(acc[1]))
+    assert np.allclose(acc[0], -acc[1], rtol=rtol, atol=0)
+    # compare squared magnitudes, no sqrt needed
+    m0_sq = float(acc[0, 0])**2 + float(acc[0, 1])**2
+    m1_sq = float(acc[1, 0])**2 + float(acc[1, 1])**2
+    assert math.isclose(m0_sq, m1_sq, rel_tol=rtol)
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_dtype_preserved(dtype):
+    positions = np.ascontiguousarray(_POS2, dtype=dtype)
+    masses = np.ascontiguousarray(_M2, dtype=dtype)
+    acc = compute_accelerations(positions, masses, G=6.67430e-11)
+    # no implicit upcast of float32 inputs
+    assert acc.dtype == dtype
+
+@pytest.mark.parametrize("N", [4, 32, 256])
+def test_compute_accelerations_matches_pairwise_loop(N):
+    rng = np.random.default_rng(N)
+    positions = rng.standard_normal((N, 2)).astype(np.float32)
+    masses = rng.uniform(1, 10, N).astype(np.float32)
+    G = 6.67430e-11
+    # Reference: plain double loop over pairs, in float64
+    acc_ref = np.zeros((N, 2))
+    for i in range(N):
+        for j in range(N):
+            if i != j:
+                dx = float(positions[j, 0]) - float(positions[i, 0])
+                dy = float(positions[j, 1]) - float(positions[i, 1])
+                r2 = dx * dx + dy * dy + epsilon**2
+                acc_ref[i, 0] += G * float(masses[j]) * dx * r2**-1.5
+                acc_ref[i, 1] += G * float(masses[j]) * dy * r2**-1.5
+    acc = compute_accelerations(positions, masses, G=G)
+    # Accelerations are ~1e-9 here, so the absolute tolerance is scaled to them
+    assert np.allclose(acc, acc_ref, rtol=1e-4, atol=1e-6 * np.abs(acc_ref).max())
+
+def test_center_of_gravity_matches_per_step_sum():
+    rng = np.random.default_rng(0)
+    trajectories = rng.standard_normal((20, 5, 2)) * 1e11
+    masses = rng.uniform(1e23, 1e30, 5)
+    cog = center_of_gravity(trajectories, masses)
+    ref = np.array([masses @ positions / masses.sum() for positions in trajectories])
+    assert cog.shape == (20, 2)
+    assert np.allclose(cog, ref, rtol=1e-12, atol=0)
+
+def test_center_of_gravity_float32_no_overflow():
+    # m_i * r_i exceeds the float32 range for Jupiter and beyond
+    _, masses, positions, _ = get_planets(9, dtype=np.float32)
+    cog = center_of_gravity(positions[None], masses)
+    ref = masses.astype(np.float64) @ positions.astype(np.float64) / masses.sum(dtype=np.float64)
+    assert cog.dtype == np.float32
+    assert np.isfinite(cog).all()
+    assert np.allclose(cog[0], ref, rtol=1e-5, atol=0)
 
 # --- Planets tests ---
 
+@functools.lru_cache(maxsize=8)
+def _planets(n):
+    """Cached `get_planets(n)`, with read-only arrays."""
+    names, masses, positions, velocities = get_planets(n)
+    for arr in (masses, positions, velocities):
+        arr.flags.writeable = False
+    return names, masses, positions, velocities
+
 def test_get_planets_output_shapes():
-    names, masses, positions, velocities = get_planets(3)
+    names, masses, positions, velocities = _planets(3)
     assert len(names) == 3
     assert masses.shape == (3,)
     assert positions.shape == (3, 2)
     assert velocities.shape == (3, 2)
 
 def test_get_planets_positions_and_velocities():
-    names, masses, positions, velocities = get_planets(2)
+    names, masses, positions, velocities = _planets(2)
     # Sun at origin
     assert np.allclose(positions[0], [0, 0])
     # Planets on x-axis, velocities along y
@@ -47,33 +133,235 @@ def test_get_planets_positions_and_velocities():
         assert velocities[i][0] == 0.0
         assert velocities[i][1] > 0.0
 
+def test_get_planets_float32():
+    names, masses, positions, velocities = get_planets(3, dtype=np.float32)
+    assert masses.dtype == positions.dtype == velocities.dtype == np.float32
+    assert math.isclose(float(masses[0]), PLANETS[0]["mass"], rel_tol=1e-6)
+
 # --- Integration tests ---
 
-def test_euler_step_basic_motion():
-    positions = np.array([[0.0, 0.0]])
-    velocities = np.array([[1.0, 0.0]])
-    masses = np.array([1.0])
+@pytest.fixture(scope="module")
+def base_state():
+    """Single body moving along x; read-only, copy before stepping."""
+    state = (np.array([[0.0, 0.0]]), np.array([[1.0, 0.0]]), np.array([1.0]))
+    for arr in state:
+        arr.flags.writeable = False
+    return state
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+@pytest.mark.parametrize("step_fn,name", [(euler_step, "euler"), (rk4_step, "rk4")])
+def test_step_basic_motion(base_state, step_fn, name, dtype):
+    positions, velocities, masses = (np.ascontiguousarray(a, dtype=dtype) for a in base_state)
     dt = 0.1
-    new_pos, new_vel = euler_step(positions, velocities, masses, dt, G=6.67430e-11)
+    new_pos, new_vel = positions.copy(), velocities.copy()
+    step_fn(new_pos, new_vel, masses, dt, G=6.67430e-11)
     # Should move roughly in x direction
-    assert new_pos[0][0] > positions[0][0]
-    assert new_pos[0][1] == positions[0][1]
+    assert new_pos[0][0] > positions[0][0], name
+    assert new_pos[0][1] == positions[0][1], name
+
+@pytest.mark.parametrize("step_fn", [euler_step, rk4_step])
+def test_step_writes_output_buffers(step_fn):
+    _, masses, positions, velocities = _planets(3)
+    dt, G = 86400.0, 6.67430e-11
+    out_pos = np.empty_like(positions)
+    out_vel = np.empty_like(velocities)
+    new_pos, new_vel = step_fn(positions, velocities, masses, dt, G=G,
+                               out_pos=out_pos, out_vel=out_vel)
+    assert new_pos is out_pos and new_vel is out_vel
+    # Inputs are left untouched; same result as stepping in place
+    ref_pos, ref_vel = positions.copy(), velocities.copy()
+    step_fn(ref_pos, ref_vel, masses, dt, G=G)
+    assert np.array_equal(out_pos, ref_pos)
+    assert np.array_equal(out_vel, ref_vel)
+
+def test_rk4_step_reuses_scratch():
+    _, masses, positions, velocities = _planets(3)
+    scratch = RK4Scratch(positions)
+    pos_a, vel_a = positions.copy(), velocities.copy()
+    rk4_step(pos_a, vel_a, masses, 86400.0, 6.67430e-11)
+    for _ in range(2):
+        pos_b, vel_b = positions.copy(), velocities.copy()
+        rk4_step(pos_b, vel_b, masses, 86400.0, 6.67430e-11, scratch=scratch)
+    assert np.array_equal(pos_a, pos_b)
+    assert np.array_equal(vel_a, vel_b)
 
-def test_rk4_step_basic_motion():
-    positions = np.array([[0.0, 0.0]])
-    velocities = np.array([[1.0, 0.0]])
-    masses = np.array([1.0])
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_verlet_step_basic_motion(base_state, dtype):
+    positions, velocities, masses = (np.ascontiguousarray(a, dtype=dtype) for a in base_state)
     dt = 0.1
-    new_pos, new_vel = rk4_step(positions, velocities, masses, dt, G=6.67430e-11)
+    acc = compute_accelerations(positions, masses, G=6.67430e-11)
+    new_pos, new_vel = positions.copy(), velocities.copy()
+    verlet_step(new_pos, new_vel, acc, masses, dt, G=6.67430e-11)
     assert new_pos[0][0] > positions[0][0]
     assert new_pos[0][1] == positions[0][1]
 
-def test_rk4_vs_euler_small_dt():
-    positions = np.array([[0.0, 0.0]])
-    velocities = np.array([[1.0, 0.0]])
-    masses = np.array([1.0])
+def test_verlet_conserves_energy():
+    _, masses, pos, vel = get_planets(2)
+    G, dt = 6.67430e-11, 86400.0
+
+    def energy(pos, vel):
+        r = np.linalg.norm(pos[1] - pos[0])
+        return 0.5 * np.sum(masses * np.sum(vel**2, axis=1)) - G * masses[0] * masses[1] / r
+
+    e0 = energy(pos, vel)
+    acc = compute_accelerations(pos, masses, G)
+    for _ in range(3650):
+        verlet_step(pos, vel, acc, masses, dt, G)
+    assert abs((energy(pos, vel) - e0) / e0) < 1e-4
+
+def test_dopri5_more_accurate_than_rk4():
+    # Circular orbit: after a quarter period the exact position is known
+    G, M = 1.0, 1.0
+    masses = np.array([M, 0.0])
+    positions = _POS2
+    velocities = np.array([[0.0, 0.0], [0.0, 1.0]])
+    steps = 20
+    dt = 0.5 * np.pi / steps
+    pos_rk4, vel_rk4 = positions.copy(), velocities.copy()
+    pos_dp, vel_dp = positions.copy(), velocities.copy()
+    acc = compute_accelerations(pos_dp, masses, G)
+    for _ in range(steps):
+        rk4_step(pos_rk4, vel_rk4, masses, dt, G)
+        dopri5_step(pos_dp, vel_dp, acc, masses, dt, G)
+    # First same as last: acc is left at the new positions
+    assert np.allclose(acc, compute_accelerations(pos_dp, masses, G), rtol=1e-12)
+    err_rk4 = np.linalg.norm(pos_rk4[1] - [0.0, 1.0])
+    err_dp = np.linalg.norm(pos_dp[1] - [0.0, 1.0])
+    assert err_dp < 0.1 * err_rk4
+
+def test_rk4_vs_euler_small_dt(base_state):
+    positions, velocities, masses = base_state
     dt = 1e-6
-    pos_euler, _ = euler_step(positions, velocities, masses, dt, G=6.67430e-11)
-    pos_rk4, _ = rk4_step(positions, velocities, masses, dt, G=6.67430e-11)
+    pos_euler, vel_euler = positions.copy(), velocities.copy()
+    euler_step(pos_euler, vel_euler, masses, dt, G=6.67430e-11)
+    pos_rk4, vel_rk4 = positions.copy(), velocities.copy()
+    rk4_step(pos_rk4, vel_rk4, masses, dt, G=6.67430e-11)
     # With tiny dt, RK4 and Euler should be nearly equal
     assert np.allclose(pos_euler, pos_rk4, rtol=1e-8, atol=1e-12)
+
+@pytest.mark.parametrize("nplanets", [2, 4])
+def test_kernel_run_loop_matches_numpy(nplanets):
+    from solar_system import _kernels
+    _, masses, positions, velocities = get_planets(nplanets)
+    dt, G = 86400.0, 6.67430e-11
+    traj = _kernels.run_loop(positions, velocities, masses, dt, G, 3, _kernels.RK4)
+    pos, vel = positions.copy(), velocities.copy()
+    for step in range(1, 4):
+        rk4_step(pos, vel, masses, dt, G)
+        assert np.allclose(traj[step], pos, rtol=1e-12)
+    assert traj.shape == (4, nplanets, 2)
+
+def test_kernel_dopri5_matches_numpy():
+    from solar_system import _kernels
+    _, masses, positions, velocities = get_planets(4)
+    dt, G = 86400.0, 6.67430e-11
+    traj = _kernels.run_loop(positions, velocities, masses, dt, G, 3, _kernels.DOPRI5)
+    pos, vel = positions.copy(), velocities.copy()
+    acc = compute_accelerations(pos, masses, G)
+    for step in range(1, 4):
+        dopri5_step(pos, vel, acc, masses, dt, G)
+        assert np.allclose(traj[step], pos, rtol=1e-12)
+
+def test_c_backend_matches_kernel():
+    from solar_system import _cnbody, _kernels
+    if not _cnbody.HAVE_CEXT:
+        pytest.skip("C extension not built")
+    rng = np.random.default_rng(0)
+    positions = rng.standard_normal((50, 2)) * 1e11
+    masses = rng.uniform(1e23, 1e27, 50)
+    acc_c = _cnbody.accel2d(positions, masses, 6.67430e-11, _kernels.EPS2,
+                            np.empty_like(positions))
+    acc_ref = np.empty_like(positions)
+    _kernels._accel(positions, masses, 6.67430e-11, acc_ref)
+    assert np.allclose(acc_c, acc_ref, rtol=1e-10)
+
+@pytest.mark.parametrize("mass_dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("cext", [True, False])
+def test_float64_backends_match_kernel(monkeypatch, cext, mass_dtype):
+    from solar_system import _cnbody, _kernels
+    if cext and not _cnbody.HAVE_CEXT:
+        pytest.skip("C extension not built")
+    # cext=False exercises the chunked NumPy path even when the C kernel is built
+    monkeypatch.setattr(_cnbody, "HAVE_CEXT", cext)
+    rng = np.random.default_rng(0)
+    positions = rng.standard_normal((50, 2)) * 1e11
+    masses = rng.uniform(1e23, 1e27, 50).astype(mass_dtype)
+    acc = compute_accelerations(positions, masses, 6.67430e-11)
+    acc_ref = np.empty_like(positions)
+    _kernels._accel(positions, masses.astype(np.float64), 6.67430e-11, acc_ref)
+    assert acc.dtype == np.float64
+    assert np.allclose(acc, acc_ref, rtol=1e-10, atol=0)
+
+def test_barnes_hut_theta_zero_is_exact():
+    from solar_system.barneshut import compute_accelerations_bh
+    rng = np.random.default_rng(0)
+    positions = rng.standard_normal((64, 2)) * 1e11
+    masses = rng.uniform(1e23, 1e27, 64)
+    acc_bh = compute_accelerations_bh(positions, masses, theta=0.0)
+    assert np.allclose(acc_bh, compute_accelerations(positions, masses), rtol=1e-10)
+
+@pytest.mark.parametrize("N", [256, 1024])
+@pytest.mark.parametrize("theta", [0.1, 0.5])
+def test_barnes_hut_matches_direct(theta, N):
+    from solar_system.barneshut import compute_accelerations_bh
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(-1.0, 1.0, (N, 2))
+    masses = rng.uniform(1.0, 10.0, N)
+    acc_direct = compute_accelerations(positions, masses, G=1.0)
+    acc_bh = compute_accelerations_bh(positions, masses, G=1.0, theta=theta)
+    # Some bodies feel almost no net force: allow a small absolute error
+    # relative to the largest acceleration
+    rtol = theta * 0.1
+    atol = 1e-2 * rtol * np.abs(acc_direct).max()
+    assert np.allclose(acc_direct, acc_bh, rtol=rtol, atol=atol)
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("force", ["direct", "bh"])
+def test_benchmark_forces_1024(request, force):
+    pytest.importorskip("pytest_benchmark")
+    benchmark = request.getfixturevalue("benchmark")
+    from solar_system.barneshut import compute_accelerations_bh
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(-1.0, 1.0, (1024, 2))
+    masses = rng.uniform(1.0, 10.0, 1024)
+    func = compute_accelerations if force == "direct" else compute_accelerations_bh
+    acc = benchmark(func, positions, masses, 1.0)
+    assert acc.shape == (1024, 2)
+
+def test_kernel_run_loop_bh_matches_direct():
+    from solar_system import _kernels
+    if not _kernels.HAVE_NUMBA:
+        pytest.skip("Numba not installed")
+    _, masses, positions, velocities = get_planets(9)
+    dt, G = 86400.0, 6.67430e-11
+    traj = _kernels.run_loop(positions, velocities, masses, dt, G, 10, _kernels.VERLET)
+    traj_bh = _kernels.run_loop_bh(positions, velocities, masses, dt, G, 10,
+                                   _kernels.VERLET, 0.5)
+    assert np.allclose(traj_bh, traj, rtol=1e-6, atol=1e-6 * np.abs(traj).max())
+    with pytest.raises(ValueError):
+        _kernels.run_loop_bh(positions, velocities, masses, dt, G, 10, _kernels.VERLET, 0.0)
+
+@pytest.mark.parametrize("theta", [0.0, -0.5])
+def test_run_simulation_rejects_nonpositive_theta(theta):
+    from solar_system.run_simulation import run_simulation
+    with pytest.raises(ValueError, match="theta"):
+        run_simulation(steps=1, force="bh", theta=theta)
+
+def test_plots_are_saved_without_touching_rcparams(tmp_path, monkeypatch):
+    pytest.importorskip("matplotlib")
+    from solar_system.plot_utils import plot_trajectories, plot_timeseries
+    import matplotlib.pyplot as plt
+    # plot_timeseries saves under ./outputs/
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "outputs").mkdir()
+    threshold = plt.rcParams["path.simplify_threshold"]
+    trajectories = np.random.default_rng(0).standard_normal((50, 3, 2))
+    time = np.arange(50.0)
+    plot_trajectories(trajectories, labels=["a", "b", "c"], savefile="orbits.png",
+                      show=False)
+    plot_timeseries(time, trajectories, labels=["a", "b", "c"],
+                    cog_positions=trajectories.mean(axis=1),
+                    savefile="timeseries.png", show=False)
+    assert (tmp_path / "orbits.png").stat().st_size > 0
+    assert (tmp_path / "outputs" / "timeseries.png").stat().st_size > 0
+    assert plt.rcParams["path.simplify_threshold"] == threshold